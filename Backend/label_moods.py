@@ -0,0 +1,205 @@
+"""Offline bulk lyrics-to-mood labelling.
+
+Reads a CSV or Parquet lyrics file in bounded-memory chunks, classifies each
+chunk across a process pool with the same moods as predict_mood, and writes
+one output part per chunk into an output directory. Progress is checkpointed
+after every part, so an interrupted run picks up where it left off.
+
+Usage:
+    python label_moods.py lyrics.csv labelled/ --text-column lyrics --id-column track_id
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from services.mood_service import classify_moods
+
+CHECKPOINT_FILE = "_checkpoint.json"
+
+
+def checkpoint_identity(input_path, text_column, id_column):
+    """What a checkpoint was written for; resuming against anything else is refused"""
+    stat = os.stat(input_path)
+    return {
+        "input": os.path.abspath(input_path),
+        "input_size": stat.st_size,
+        "input_mtime": stat.st_mtime,
+        "text_column": text_column,
+        "id_column": id_column
+    }
+
+
+def read_checkpoint(output_dir, identity=None):
+    """Number of input rows already labelled in output_dir.
+
+    Raises ValueError if the checkpoint was written for a different input
+    file or column settings than identity.
+    """
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        checkpoint = json.load(f)
+
+    if identity is not None:
+        stored = {key: checkpoint.get(key) for key in identity}
+        if stored != identity:
+            mismatched = ", ".join(key for key in identity if stored[key] != identity[key])
+            raise ValueError(
+                f"{output_dir} holds labels for a different run (mismatched: {mismatched}); "
+                f"use a new output directory or delete {CHECKPOINT_FILE} to start over"
+            )
+    return checkpoint["rows_done"]
+
+
+def write_checkpoint(output_dir, rows_done, identity):
+    path = os.path.join(output_dir, CHECKPOINT_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"rows_done": rows_done, **identity, "updated_at": time.time()}, f)
+    os.replace(tmp_path, path)
+
+
+def iter_chunks(input_path, columns, chunk_size, skip_rows):
+    """Yield DataFrame chunks of the requested columns, starting after skip_rows"""
+    if input_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(input_path)
+        # Skip whole row groups from metadata; only the first partial group is decoded
+        first_group, skipped = 0, 0
+        while first_group < parquet.num_row_groups:
+            group_rows = parquet.metadata.row_group(first_group).num_rows
+            if skipped + group_rows > skip_rows:
+                break
+            skipped += group_rows
+            first_group += 1
+
+        row_groups = list(range(first_group, parquet.num_row_groups))
+        if not row_groups:
+            return
+        for batch in parquet.iter_batches(batch_size=chunk_size, row_groups=row_groups, columns=columns):
+            if skipped + batch.num_rows <= skip_rows:
+                skipped += batch.num_rows
+                continue
+            chunk = batch.to_pandas()
+            if skipped < skip_rows:
+                chunk = chunk.iloc[skip_rows - skipped:]
+                skipped = skip_rows
+            yield chunk
+    else:
+        reader = pd.read_csv(
+            input_path,
+            usecols=columns,
+            chunksize=chunk_size,
+            # A callable keeps resume memory flat; a range is expanded into a set
+            skiprows=lambda i: 0 < i <= skip_rows
+        )
+        for chunk in reader:
+            yield chunk
+
+
+def label_chunk(offset, chunk, text_column, id_column):
+    """Classify one chunk; runs in a worker process"""
+    labels = classify_moods(chunk[text_column].tolist())
+    labels.insert(0, "row", range(offset, offset + len(chunk)))
+    if id_column:
+        labels.insert(1, id_column, chunk[id_column].to_numpy())
+    return offset, labels
+
+
+def write_part(output_dir, offset, labels, output_format):
+    # Parts are named by their starting row, so a re-run chunk overwrites its own part
+    path = os.path.join(output_dir, f"part-{offset:012d}.{output_format}")
+    if output_format == "parquet":
+        labels.to_parquet(path, index=False)
+    else:
+        labels.to_csv(path, index=False)
+
+
+def run(input_path, output_dir, text_column="lyrics", id_column=None, chunk_size=50000,
+        workers=None, output_format="parquet"):
+    """Label input_path into output_dir, resuming from the last checkpoint.
+
+    Raises ImportError if parquet is needed but pyarrow is missing, and
+    ValueError if output_dir was checkpointed for a different run.
+    """
+    if output_format == "parquet" or input_path.endswith(".parquet"):
+        # Fail before any work is done rather than on the first part write
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("Parquet input/output needs pyarrow: pip install pyarrow") from e
+
+    identity = checkpoint_identity(input_path, text_column, id_column)
+    os.makedirs(output_dir, exist_ok=True)
+    rows_done = read_checkpoint(output_dir, identity)
+    if rows_done:
+        print(f"Resuming from row {rows_done}")
+
+    columns = [text_column] + ([id_column] if id_column else [])
+    workers = workers or os.cpu_count() or 1
+    started = time.time()
+    rows_labelled = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        offset = rows_done
+
+        def drain_one():
+            # Results are written in input order so the checkpoint offset stays contiguous
+            nonlocal rows_done, rows_labelled
+            part_offset, labels = pending.popleft().result()
+            write_part(output_dir, part_offset, labels, output_format)
+            rows_done = part_offset + len(labels)
+            rows_labelled += len(labels)
+            write_checkpoint(output_dir, rows_done, identity)
+
+            elapsed = time.time() - started
+            rate = rows_labelled / elapsed if elapsed else 0
+            print(f"Labelled {rows_done} rows ({rate:,.0f} rows/s)")
+
+        for chunk in iter_chunks(input_path, columns, chunk_size, rows_done):
+            if chunk.empty:
+                continue
+            # Bound the number of chunks held in memory
+            if len(pending) >= workers * 2:
+                drain_one()
+            pending.append(pool.submit(label_chunk, offset, chunk, text_column, id_column))
+            offset += len(chunk)
+
+        while pending:
+            drain_one()
+
+    elapsed = time.time() - started
+    rate = rows_labelled / elapsed if elapsed else 0
+    print(f"✅ Done: {rows_labelled} rows in {elapsed:.1f}s ({rate:,.0f} rows/s), {rows_done} rows total")
+    return rows_done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Label a lyrics corpus with moods")
+    parser.add_argument("input", help="Input .csv or .parquet file")
+    parser.add_argument("output", help="Output directory for labelled parts and checkpoint")
+    parser.add_argument("--text-column", default="lyrics", help="Column holding the lyrics text")
+    parser.add_argument("--id-column", help="Column copied through to the output, e.g. track_id")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet",
+                        help="Output part format (parquet needs pyarrow)")
+    args = parser.parse_args()
+
+    try:
+        run(args.input, args.output, args.text_column, args.id_column, args.chunk_size,
+            args.workers, args.format)
+    except (ImportError, ValueError) as e:
+        raise SystemExit(f"❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+import threading
+import time
+import numpy as np
+from utils import get_fallback_genres
+from services.circuit_breaker import guarded_call
+
+# Audio features tracked per user (order matters: it is the column order in the store)
+PROFILE_FEATURES = ('valence', 'energy', 'danceability', 'acousticness', 'instrumentalness')
+
+TOP_GENRE_SLOTS = 8
+RECENT_TRACK_SLOTS = 8
+SPOTIFY_ID_LENGTH = 22
+EMPTY_GENRE = np.iinfo(np.uint16).max
+MAX_GENRE_COUNT = np.iinfo(np.uint16).max
+PROFILE_MAX_AGE_SECONDS = 6 * 60 * 60
+TOKEN_CACHE_SIZE = 10000
+
+# One packed row per user, ~250 bytes each
+PROFILE_DTYPE = np.dtype([
+    ('count', np.uint32),
+    ('mean', np.float32, (len(PROFILE_FEATURES),)),
+    ('m2', np.float32, (len(PROFILE_FEATURES),)),
+    ('genre_ids', np.uint16, (TOP_GENRE_SLOTS,)),
+    ('genre_counts', np.uint16, (TOP_GENRE_SLOTS,)),
+    ('recent', f'S{SPOTIFY_ID_LENGTH}', (RECENT_TRACK_SLOTS,)),
+    ('recent_head', np.uint8),
+    ('refreshed_at', np.uint32),
+])
+
+GENRE_VOCAB = get_fallback_genres()
+GENRE_INDEX = {genre: i for i, genre in enumerate(GENRE_VOCAB)}
+
+
+def normalize_genre(genre):
+    """Map a free-form Spotify artist genre onto the seed genre vocabulary"""
+    if not genre:
+        return None
+    genre = genre.lower().strip()
+    for candidate in (genre, genre.replace(' ', '-'), genre.replace('&', '-n-').replace(' ', '-')):
+        if candidate in GENRE_INDEX:
+            return GENRE_INDEX[candidate]
+    # "dance pop" -> "pop", "uk hip hop" -> "hip-hop"
+    words = genre.split()
+    for size in (2, 1):
+        for i in range(len(words) - size, -1, -1):
+            candidate = '-'.join(words[i:i + size])
+            if candidate in GENRE_INDEX:
+                return GENRE_INDEX[candidate]
+    return None
+
+
+class UserProfileStore:
+    """Compact, array-backed store of per-user taste profiles"""
+
+    __slots__ = ('_rows', '_index', '_size', '_lock')
+
+    def __init__(self, capacity=1024):
+        self._rows = self._empty_rows(max(capacity, 1))
+        self._index = {}
+        self._size = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _empty_rows(capacity):
+        rows = np.zeros(capacity, dtype=PROFILE_DTYPE)
+        rows['genre_ids'] = EMPTY_GENRE
+        return rows
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, user_id):
+        return user_id in self._index
+
+    @property
+    def nbytes(self):
+        """Bytes used by profile rows currently in the store"""
+        return self._size * PROFILE_DTYPE.itemsize
+
+    def _row(self, user_id, create=False):
+        row = self._index.get(user_id)
+        if row is not None or not create:
+            return row
+
+        if self._size == len(self._rows):
+            grown = self._empty_rows(len(self._rows) * 2)
+            grown[:self._size] = self._rows
+            self._rows = grown
+
+        row = self._size
+        self._index[user_id] = row
+        self._size += 1
+        return row
+
+    def add_tracks(self, user_id, audio_features=(), genres=(), track_ids=()):
+        """Fold a batch of tracks into a user's profile.
+
+        audio_features: Spotify audio feature dicts (None entries are skipped)
+        genres: artist genre strings, one entry per occurrence
+        track_ids: Spotify track ids, oldest first
+        """
+        with self._lock:
+            row = self._row(user_id, create=True)
+            profile = self._rows[row]
+
+            self._add_features(profile, audio_features)
+            for genre in genres:
+                genre_id = normalize_genre(genre)
+                if genre_id is not None:
+                    self._add_genre(profile, genre_id)
+            for track_id in track_ids:
+                self._add_recent(profile, track_id)
+
+    def rebuild(self, user_id, audio_features=(), genres=(), track_ids=(), now=None):
+        """Replace a user's profile with one built from a fresh pull and mark it refreshed.
+
+        Each part (feature stats, genre counts, recent ring) is only replaced when
+        the pull produced data for it, so a failed upstream call keeps the old part.
+        """
+        fresh = self._empty_rows(1)[0]
+        self._add_features(fresh, audio_features)
+        for genre in genres:
+            genre_id = normalize_genre(genre)
+            if genre_id is not None:
+                self._add_genre(fresh, genre_id)
+        for track_id in track_ids:
+            self._add_recent(fresh, track_id)
+
+        with self._lock:
+            profile = self._rows[self._row(user_id, create=True)]
+            if fresh['count']:
+                for field in ('count', 'mean', 'm2'):
+                    profile[field] = fresh[field]
+            if (fresh['genre_ids'] != EMPTY_GENRE).any():
+                for field in ('genre_ids', 'genre_counts'):
+                    profile[field] = fresh[field]
+            if fresh['recent'].any():
+                for field in ('recent', 'recent_head'):
+                    profile[field] = fresh[field]
+            profile['refreshed_at'] = int(time.time() if now is None else now)
+
+    def is_stale(self, user_id, max_age=PROFILE_MAX_AGE_SECONDS, now=None):
+        """True if a user's profile is missing or older than max_age seconds"""
+        with self._lock:
+            row = self._row(user_id)
+            if row is None:
+                return True
+            now = time.time() if now is None else now
+            return now - int(self._rows[row]['refreshed_at']) > max_age
+
+    @staticmethod
+    def _add_features(profile, audio_features):
+        vectors = [
+            [features.get(name) for name in PROFILE_FEATURES]
+            for features in audio_features
+            if features and all(features.get(name) is not None for name in PROFILE_FEATURES)
+        ]
+        if not vectors:
+            return
+
+        # Chan et al. parallel variance merge of the batch into the running stats
+        batch = np.asarray(vectors, dtype=np.float64)
+        n_a = int(profile['count'])
+        n_b = len(batch)
+        n = n_a + n_b
+        mean_a = profile['mean'].astype(np.float64)
+        mean_b = batch.mean(axis=0)
+        m2_b = ((batch - mean_b) ** 2).sum(axis=0)
+        delta = mean_b - mean_a
+
+        profile['mean'] = mean_a + delta * (n_b / n)
+        profile['m2'] = profile['m2'].astype(np.float64) + m2_b + delta ** 2 * (n_a * n_b / n)
+        profile['count'] = n
+
+    @staticmethod
+    def _add_genre(profile, genre_id):
+        # Space-saving top-k: a new genre evicts the smallest slot and inherits its count
+        ids = profile['genre_ids']
+        counts = profile['genre_counts']
+        hits = np.flatnonzero(ids == genre_id)
+        if hits.size:
+            slot = hits[0]
+        else:
+            slot = int(np.argmin(np.where(ids == EMPTY_GENRE, -1, counts.astype(np.int32))))
+            if ids[slot] == EMPTY_GENRE:
+                counts[slot] = 0
+            ids[slot] = genre_id
+        if counts[slot] < MAX_GENRE_COUNT:
+            counts[slot] += 1
+
+    @staticmethod
+    def _add_recent(profile, track_id):
+        if not track_id:
+            return
+        encoded = track_id.encode('ascii')[:SPOTIFY_ID_LENGTH]
+        if encoded in profile['recent']:
+            return
+        head = int(profile['recent_head'])
+        profile['recent'][head] = encoded
+        profile['recent_head'] = (head + 1) % RECENT_TRACK_SLOTS
+
+    def _profile(self, user_id):
+        """Copy of a user's row taken under the lock, or None"""
+        with self._lock:
+            row = self._row(user_id)
+            return None if row is None else self._rows[row].copy()
+
+    def centroid(self, user_id):
+        """Mean audio features for a user, or None if nothing has been learned yet"""
+        profile = self._profile(user_id)
+        if profile is None or profile['count'] == 0:
+            return None
+        return dict(zip(PROFILE_FEATURES, profile['mean'].astype(np.float64).round(4).tolist()))
+
+    def variance(self, user_id):
+        """Audio feature variance for a user, or None if nothing has been learned yet"""
+        profile = self._profile(user_id)
+        if profile is None or profile['count'] == 0:
+            return None
+        return dict(zip(PROFILE_FEATURES, (profile['m2'].astype(np.float64) / profile['count']).round(4).tolist()))
+
+    def top_genres(self, user_id, limit=3):
+        """User's most frequent seed genres, most frequent first"""
+        profile = self._profile(user_id)
+        if profile is None:
+            return []
+        order = np.argsort(-profile['genre_counts'].astype(np.int32), kind='stable')
+        return [
+            GENRE_VOCAB[profile['genre_ids'][slot]]
+            for slot in order
+            if profile['genre_ids'][slot] != EMPTY_GENRE
+        ][:limit]
+
+    def recent_track_ids(self, user_id):
+        """Most recently seen track ids, newest first"""
+        profile = self._profile(user_id)
+        if profile is None:
+            return []
+        head = int(profile['recent_head'])
+        ring = np.roll(profile['recent'], -head)[::-1]
+        return [track_id.decode('ascii') for track_id in ring if track_id]
+
+    def summary(self, user_id):
+        """JSON-friendly view of a user's profile"""
+        with self._lock:
+            profile = self._profile(user_id)
+            return {
+                "tracks_profiled": int(profile['count']) if profile is not None else 0,
+                "refreshed_at": int(profile['refreshed_at']) if profile is not None else None,
+                "centroid": self.centroid(user_id),
+                "variance": self.variance(user_id),
+                "top_genres": self.top_genres(user_id),
+                "recent_track_ids": self.recent_track_ids(user_id)
+            }
+
+
+def _profile_inputs(sp_client, tracks):
+    """Fetch audio features and artist genres for tracks, each track counted once"""
+    unique_tracks = {}
+    for track in tracks:
+        if track and track.get('id'):
+            unique_tracks.setdefault(track['id'], track)
+    tracks = list(unique_tracks.values())
+    track_ids = list(unique_tracks)
+    if not track_ids:
+        return [], []
+
+    audio_features = []
+    try:
+        # Spotify allows 100 ids per audio-features request
+        for i in range(0, len(track_ids), 100):
+            audio_features.extend(guarded_call(
+                sp_client, 'audio_features', track_ids[i:i + 100], client_kind='user'
+            ) or [])
+    except Exception as e:
+        print(f"Could not get audio features for profile: {e}")
+
+    artist_ids = list(dict.fromkeys(
+        track['artists'][0]['id'] for track in tracks
+        if track.get('artists') and track['artists'][0].get('id')
+    ))
+    genres = []
+    try:
+        # Spotify allows 50 ids per artists request
+        for i in range(0, len(artist_ids), 50):
+            for artist in sp_client.artists(artist_ids[i:i + 50]).get('artists', []):
+                if artist:
+                    genres.extend(artist.get('genres', []))
+    except Exception as e:
+        print(f"Could not get artist genres for profile: {e}")
+
+    return audio_features, genres
+
+
+def refresh_user_profile(sp_user, user_id, store=None, limit=50):
+    """Rebuild a user's profile from their top tracks and saved library.
+
+    If neither pull returns tracks the existing profile is left untouched and
+    stays stale, so the next request retries.
+    """
+    store = store if store is not None else user_profiles
+
+    top_tracks = []
+    try:
+        top_tracks = sp_user.current_user_top_tracks(limit=limit).get('items', [])
+    except Exception as e:
+        print(f"Could not get top tracks for profile: {e}")
+
+    saved_tracks = []
+    try:
+        saved = sp_user.current_user_saved_tracks(limit=limit)
+        saved_tracks = [item.get('track') for item in saved.get('items', []) if item.get('track')]
+    except Exception as e:
+        print(f"Could not get saved tracks for profile: {e}")
+
+    if not top_tracks and not saved_tracks:
+        print(f"No tracks pulled for profile {user_id}, keeping existing profile")
+        return store.summary(user_id)
+
+    audio_features, genres = _profile_inputs(sp_user, top_tracks + saved_tracks)
+    # Without the user-read-recently-played scope, "recent" means recently saved:
+    # the library is the only pull in date order. Spotify returns it newest first,
+    # and the ring expects oldest first.
+    recent_ids = [track['id'] for track in saved_tracks if track.get('id')][::-1]
+    store.rebuild(user_id, audio_features, genres, recent_ids)
+    return store.summary(user_id)
+
+
+def refresh_user_profile_async(sp_user, user_id, store=None):
+    """Refresh a stale profile in a background thread, at most one refresh per user at a time"""
+    with _refreshing_lock:
+        if user_id in _refreshing:
+            return False
+        _refreshing.add(user_id)
+
+    def refresh():
+        try:
+            refresh_user_profile(sp_user, user_id, store)
+        except Exception as e:
+            print(f"Could not refresh user profile: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(user_id)
+
+    threading.Thread(target=refresh, daemon=True).start()
+    return True
+
+
+def get_user_id(sp_user, access_token):
+    """Spotify user id for an access token, cached to skip a /me call per request"""
+    with _token_users_lock:
+        user_id = _token_users.get(access_token)
+    if user_id is None:
+        user_id = sp_user.current_user()['id']
+        with _token_users_lock:
+            # Tokens expire after an hour, so an occasional full reset is enough to bound the cache
+            if len(_token_users) >= TOKEN_CACHE_SIZE:
+                _token_users.clear()
+            _token_users[access_token] = user_id
+    return user_id
+
+
+def blend_mood_features(features, centroid, weight=0.3):
+    """Pull mood target features towards a user's taste centroid"""
+    if not centroid:
+        return features
+
+    blended = dict(features)
+    for key, target in features.items():
+        name = key.replace('target_', '', 1)
+        if name in centroid:
+            blended[key] = round((1 - weight) * target + weight * centroid[name], 3)
+    return blended
+
+
+# Shared in-process state used by the routes
+user_profiles = UserProfileStore()
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_token_users = {}
+_token_users_lock = threading.Lock()
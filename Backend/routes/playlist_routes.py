@@ -3,8 +3,10 @@ import traceback
 from config import sp_public, get_user_spotify_client
 from utils import (
     enhance_track_with_play_urls, get_mood_features, get_mood_search_terms,
-    safe_get_genres, validate_and_get_seed_genres
+    get_fallback_genres, safe_get_genres, validate_and_get_seed_genres
 )
+from services.circuit_breaker import guarded_call
+from models.user import user_profiles, refresh_user_profile_async, blend_mood_features, get_user_id
 
 playlist_bp = Blueprint('playlist', __name__)
 
@@ -16,6 +18,7 @@ def smart_generate_playlist():
         mood = data.get('mood')
         genre = data.get('genre', '')
         limit = data.get('limit', 20)
+        access_token = data.get('access_token')
         
         print(f"smart-generate called with: mood={mood}, genre={genre}, limit={limit}")
         
@@ -30,8 +33,24 @@ def smart_generate_playlist():
                 "error": f"Unknown mood: {mood}. Valid moods are: {list(mood_features.keys())}"
             }), 400
         
-        # Get available genres
-        available_genres = safe_get_genres(sp_public)
+        # Personalize targets with the user's taste profile when signed in
+        personalization = None
+        if access_token:
+            try:
+                sp_user = get_user_spotify_client(access_token)
+                user_id = get_user_id(sp_user, access_token)
+                # Stale or missing profiles are rebuilt off the request path
+                if user_profiles.is_stale(user_id):
+                    refresh_user_profile_async(sp_user, user_id)
+                features = blend_mood_features(features, user_profiles.centroid(user_id))
+                if not genre:
+                    genre = next(iter(user_profiles.top_genres(user_id, limit=1)), '')
+                personalization = user_profiles.summary(user_id)
+            except Exception as e:
+                print(f"Could not personalize playlist: {str(e)}")
+        
+        # Get available genres; the full seed list keeps profile genres valid when Spotify fails
+        available_genres = safe_get_genres(sp_public, get_fallback_genres())
         seed_genres = validate_and_get_seed_genres(genre, available_genres)
         
         print(f"Using seed genres: {seed_genres}")
@@ -47,7 +66,7 @@ def smart_generate_playlist():
         
         # Get recommendations from Spotify
         try:
-            recommendations = sp_public.recommendations(**rec_params)
+            recommendations = guarded_call(sp_public, 'recommendations', **rec_params)
             
             if not recommendations.get('tracks'):
                 # Try with fewer parameters if no results
@@ -56,7 +75,7 @@ def smart_generate_playlist():
                     'seed_genres': seed_genres,
                     'limit': limit
                 }
-                recommendations = sp_public.recommendations(**minimal_params)
+                recommendations = guarded_call(sp_public, 'recommendations', **minimal_params)
             
             # Enhance each track with play URLs
             for track in recommendations.get('tracks', []):
@@ -68,6 +87,7 @@ def smart_generate_playlist():
                 "genre": seed_genres[0],
                 "features_used": features,
                 "seed_genres_used": seed_genres,
+                "personalization": personalization,
                 "total_tracks": len(recommendations.get('tracks', []))
             })
             
@@ -96,6 +116,7 @@ def smart_generate_playlist():
                     "genre": seed_genres[0],
                     "method": "search_fallback",
                     "search_query": search_query,
+                    "personalization": personalization,
                     "total_tracks": len(search_results['tracks']['items'])
                 })
                 
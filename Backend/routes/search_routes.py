@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from config import sp_public
 from utils import enhance_track_with_play_urls, get_fallback_genres
+from services.circuit_breaker import guarded_call
 
 search_bp = Blueprint('search', __name__)
 
@@ -30,7 +31,7 @@ def search_tracks():
 def get_available_genres():
     """Get available genres from Spotify or fallback to hardcoded list"""
     try:
-        genres = sp_public.recommendation_genre_seeds()
+        genres = guarded_call(sp_public, 'recommendation_genre_seeds')
         return jsonify({"genres": genres['genres']})
     except Exception as e:
         print(f"Error getting genres: {str(e)}")
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify
 import traceback
 from config import sp_public, SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET
+from utils import safe_get_genres
+from services.circuit_breaker import guarded_call, circuit_states
 
 test_bp = Blueprint('test', __name__)
 
@@ -29,7 +31,7 @@ def test_spotify():
 def test_genres():
     """Test getting available genres"""
     try:
-        genres = sp_public.recommendation_genre_seeds()
+        genres = guarded_call(sp_public, 'recommendation_genre_seeds')
         return jsonify({"status": "success", "genres": genres})
     except Exception as e:
         return jsonify({"status": "error", "error": str(e)}), 500
@@ -41,13 +43,8 @@ def test_recommendations():
         print("Testing recommendations with minimal parameters...")
         
         # First, get available genres to ensure we use valid ones
-        try:
-            genres_response = sp_public.recommendation_genre_seeds()
-            available_genres = genres_response.get('genres', [])
-            print(f"Available genres: {available_genres[:10]}...")  # Print first 10
-        except Exception as e:
-            print(f"Could not get genres: {e}")
-            available_genres = ['pop', 'rock', 'jazz']  # Fallback
+        available_genres = safe_get_genres(sp_public)
+        print(f"Available genres: {available_genres[:10]}...")  # Print first 10
         
         # Test with minimal parameters first
         test_params = {
@@ -56,7 +53,7 @@ def test_recommendations():
         }
         
         print(f"Testing with params: {test_params}")
-        recommendations = sp_public.recommendations(**test_params)
+        recommendations = guarded_call(sp_public, 'recommendations', **test_params)
         
         return jsonify({
             "status": "success",
@@ -72,5 +69,11 @@ def test_recommendations():
         return jsonify({
             "status": "error",
             "error": str(e),
+            "circuits": circuit_states(),
             "traceback": traceback.format_exc()
-        }), 500
\ No newline at end of file
+        }), 500
+
+@test_bp.route('/test-circuits', methods=['GET'])
+def test_circuits():
+    """Show circuit breaker state for each upstream Spotify method"""
+    return jsonify({"status": "success", "circuits": circuit_states()})
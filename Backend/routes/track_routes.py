@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from config import sp_public
 from utils import enhance_track_with_play_urls
+from services.circuit_breaker import guarded_call
 
 track_bp = Blueprint('track', __name__)
 
@@ -15,32 +16,51 @@ def get_similar_tracks():
         return jsonify({"error": "Track ID required"}), 400
     
     try:
-        audio_features = sp_public.audio_features([track_id])[0]
-        if not audio_features:
-            return jsonify({"error": "Could not get audio features for track"}), 400
-        
         track_info = sp_public.track(track_id)
         artist_id = track_info['artists'][0]['id'] if track_info['artists'] else None
         
-        recommendations = sp_public.recommendations(
-            seed_tracks=[track_id],
-            seed_artists=[artist_id] if artist_id else [],
-            limit=limit,
-            target_danceability=audio_features['danceability'],
-            target_energy=audio_features['energy'],
-            target_valence=audio_features['valence'],
-            target_acousticness=audio_features['acousticness'],
-            target_instrumentalness=audio_features['instrumentalness']
-        )
+        try:
+            audio_features = guarded_call(sp_public, 'audio_features', [track_id])[0]
+        except Exception as e:
+            print(f"Could not get audio features for track: {str(e)}")
+            audio_features = None
+        
+        try:
+            if not audio_features:
+                raise ValueError("No audio features to seed recommendations")
+            
+            recommendations = guarded_call(
+                sp_public, 'recommendations',
+                seed_tracks=[track_id],
+                seed_artists=[artist_id] if artist_id else [],
+                limit=limit,
+                target_danceability=audio_features['danceability'],
+                target_energy=audio_features['energy'],
+                target_valence=audio_features['valence'],
+                target_acousticness=audio_features['acousticness'],
+                target_instrumentalness=audio_features['instrumentalness']
+            )
+            tracks = recommendations['tracks']
+            method = "recommendations"
+            
+        except Exception as e:
+            print(f"Spotify recommendations API error: {str(e)}")
+            
+            # Fallback: other tracks by the seed track's artist
+            artist_name = track_info['artists'][0]['name'] if track_info['artists'] else track_info['name']
+            search_results = sp_public.search(q=f'artist:"{artist_name}"', type='track', limit=limit + 1)
+            tracks = [t for t in search_results['tracks']['items'] if t['id'] != track_id][:limit]
+            method = "search_fallback"
         
         # Add play URLs to similar tracks
-        for track in recommendations['tracks']:
+        for track in tracks:
             enhance_track_with_play_urls(track)
         
         return jsonify({
-            "tracks": recommendations['tracks'],
+            "tracks": tracks,
             "seed_track": track_info,
-            "audio_features": audio_features
+            "audio_features": audio_features,
+            "method": method
         })
         
     except Exception as e:
@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Client errors caused by the caller (bad request, expired token) say nothing about upstream health
+CALLER_ERROR_STATUSES = (400, 401)
+
+# Defaults for upstream Spotify methods
+WINDOW_SECONDS = 60
+MIN_REQUESTS = 3
+ERROR_THRESHOLD = 0.5
+CONSECUTIVE_FAILURES = 3
+COOLDOWN_SECONDS = 30
+MAX_COOLDOWN_SECONDS = 600
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because its circuit is open"""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Rolling error-rate circuit breaker for a single upstream method.
+
+    closed: calls go through and outcomes are recorded in the window; the
+    circuit opens on a high error rate or a run of consecutive failures.
+    open: calls are rejected until the cooldown elapses.
+    half_open: a single probe call is let through; success closes the
+    circuit, failure reopens it with a doubled cooldown.
+    """
+
+    def __init__(self, name, window_seconds=WINDOW_SECONDS, min_requests=MIN_REQUESTS,
+                 error_threshold=ERROR_THRESHOLD, consecutive_failures=CONSECUTIVE_FAILURES,
+                 cooldown_seconds=COOLDOWN_SECONDS,
+                 max_cooldown_seconds=MAX_COOLDOWN_SECONDS, clock=time.monotonic):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.error_threshold = error_threshold
+        self.consecutive_failures = consecutive_failures
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._window = deque()  # (timestamp, succeeded)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._cooldown = cooldown_seconds
+        self._probe_in_flight = False
+        self._failure_streak = 0
+
+    def _trim(self, now):
+        while self._window and now - self._window[0][0] > self.window_seconds:
+            self._window.popleft()
+
+    def _error_rate(self):
+        if not self._window:
+            return 0.0
+        failures = sum(1 for _, succeeded in self._window if not succeeded)
+        return failures / len(self._window)
+
+    def _retry_in(self, now):
+        return max(0.0, self._opened_at + self._cooldown - now)
+
+    def _current_state(self, now):
+        # An open circuit whose cooldown has passed is ready for a probe
+        if self._state == OPEN and self._retry_in(now) == 0:
+            return HALF_OPEN
+        return self._state
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(self._clock())
+
+    def allow_request(self):
+        """Reserve a call slot; in half-open state only one probe is allowed at a time"""
+        with self._lock:
+            now = self._clock()
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if self._retry_in(now) > 0:
+                    return False
+                self._state = HALF_OPEN
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                print(f"Circuit '{self.name}' closed after successful probe")
+                self._state = CLOSED
+                self._window.clear()
+                self._cooldown = self.cooldown_seconds
+                self._probe_in_flight = False
+            self._failure_streak = 0
+            self._window.append((now, True))
+            self._trim(now)
+
+    def record_failure(self):
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown_seconds)
+                self._open(now)
+                return
+            self._window.append((now, False))
+            self._failure_streak += 1
+            self._trim(now)
+            if self._state != CLOSED:
+                return
+            if (self._failure_streak >= self.consecutive_failures
+                    or (len(self._window) >= self.min_requests
+                        and self._error_rate() >= self.error_threshold)):
+                self._open(now)
+
+    def record_ignored(self):
+        """Release a probe slot for a call whose outcome says nothing about the upstream"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _open(self, now):
+        print(f"Circuit '{self.name}' opened, retry in {self._cooldown:.0f}s")
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self._failure_streak = 0
+        self._window.clear()
+
+    def call(self, func, *args, **kwargs):
+        """Call func through the breaker, raising CircuitOpenError when rejected"""
+        if not self.allow_request():
+            with self._lock:
+                retry_in = self._retry_in(self._clock())
+            raise CircuitOpenError(self.name, retry_in)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if getattr(e, 'http_status', None) in CALLER_ERROR_STATUSES:
+                self.record_ignored()
+            else:
+                self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self):
+        """JSON-friendly view of the breaker state"""
+        with self._lock:
+            now = self._clock()
+            self._trim(now)
+            return {
+                "state": self._current_state(now),
+                "requests_in_window": len(self._window),
+                "error_rate": round(self._error_rate(), 3),
+                "consecutive_failures": self._failure_streak,
+                "retry_in": round(self._retry_in(now), 1) if self._state == OPEN else 0
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """Get (or create) the shared breaker for an upstream method"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def guarded_call(sp_client, method, *args, client_kind='public', **kwargs):
+    """Call a Spotify client method through the breaker for that client kind and method"""
+    breaker = get_breaker(f"{client_kind}:{method}")
+    return breaker.call(getattr(sp_client, method), *args, **kwargs)
+
+
+def circuit_states():
+    """Snapshot of every breaker created so far"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -0,0 +1,49 @@
+import re
+import numpy as np
+import pandas as pd
+from utils import get_mood_features, get_mood_search_terms
+
+MOODS = list(get_mood_features().keys())
+DEFAULT_MOOD = "energetic"
+
+# Whole-word keyword patterns per mood, built from the mood name and its search terms;
+# common suffixes are allowed so "sadness" counts but "saddle" does not
+MOOD_PATTERNS = {
+    mood: r'\b(?:' + '|'.join(
+        re.escape(word) for word in dict.fromkeys([mood] + get_mood_search_terms().get(mood, '').split())
+        if len(word) > 2
+    ) + r')(?:s|es|ness|ing|ed)?\b'
+    for mood in MOODS
+}
+
+
+def score_moods(texts) -> np.ndarray:
+    """Count mood keyword hits for each text, one column per mood in MOODS"""
+    texts = pd.Series(texts, dtype="object").fillna("").astype(str).str.lower()
+    return np.column_stack([
+        texts.str.count(MOOD_PATTERNS[mood]).to_numpy(dtype=np.float32)
+        for mood in MOODS
+    ])
+
+
+def classify_moods(texts) -> pd.DataFrame:
+    """Label texts with a mood, a confidence and per-mood scores"""
+    scores = score_moods(texts)
+    totals = scores.sum(axis=1, keepdims=True)
+    shares = np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+
+    # Ties go to the mood listed first; texts with no hits fall back to DEFAULT_MOOD
+    best = shares.argmax(axis=1)
+    labels = np.where(totals[:, 0] > 0, np.asarray(MOODS, dtype=object)[best], DEFAULT_MOOD)
+
+    result = pd.DataFrame({
+        "mood": labels,
+        "confidence": shares.max(axis=1)
+    })
+    for i, mood in enumerate(MOODS):
+        result[f"score_{mood}"] = shares[:, i]
+    return result
+
+
+def predict_mood(text: str) -> str:
+    return classify_moods([text])["mood"].iloc[0]
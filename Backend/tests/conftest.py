@@ -0,0 +1,8 @@
+import pytest
+from services import circuit_breaker
+
+
+@pytest.fixture(autouse=True)
+def isolated_breakers(monkeypatch):
+    """Give each test its own breaker registry so circuit state never leaks between tests"""
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
@@ -0,0 +1,119 @@
+import pytest
+from services.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, circuit_states, get_breaker,
+    guarded_call
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class UpstreamError(Exception):
+    def __init__(self, http_status=None):
+        super().__init__(f"upstream failed with {http_status}")
+        self.http_status = http_status
+
+
+def fail(status=500):
+    raise UpstreamError(status)
+
+
+def make_breaker(**kwargs):
+    clock = FakeClock()
+    return CircuitBreaker('test', clock=clock, cooldown_seconds=10, **kwargs), clock
+
+
+def trip(breaker, times=3):
+    for _ in range(times):
+        with pytest.raises(UpstreamError):
+            breaker.call(fail)
+
+
+def test_opens_on_error_rate_and_fails_fast():
+    breaker, _ = make_breaker(consecutive_failures=100)
+    breaker.call(lambda: 'ok')
+    breaker.call(lambda: 'ok')
+    trip(breaker, 1)
+    assert breaker.state == CLOSED
+
+    trip(breaker, 1)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'never called')
+
+
+def test_slow_consecutive_failures_trip_the_circuit():
+    breaker, clock = make_breaker()
+    for _ in range(3):
+        clock.now += 31
+        trip(breaker, 1)
+    assert breaker.state == OPEN
+
+
+def test_probe_success_closes_circuit():
+    breaker, clock = make_breaker()
+    trip(breaker)
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.snapshot()['state'] == HALF_OPEN
+
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+
+
+def test_probe_failure_reopens_with_longer_cooldown():
+    breaker, clock = make_breaker()
+    trip(breaker)
+    clock.now += 10
+    trip(breaker, 1)
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    assert breaker.state == OPEN
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+
+
+def test_only_one_probe_at_a_time():
+    breaker, clock = make_breaker()
+    trip(breaker)
+    clock.now += 10
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_caller_errors_are_not_counted():
+    breaker, clock = make_breaker()
+    for _ in range(5):
+        with pytest.raises(UpstreamError):
+            breaker.call(fail, 401)
+    assert breaker.state == CLOSED
+
+    trip(breaker)
+    clock.now += 10
+    with pytest.raises(UpstreamError):
+        breaker.call(fail, 401)
+    # The probe slot is released for the next caller
+    assert breaker.allow_request()
+
+
+def test_breakers_are_keyed_by_client_kind():
+    class Client:
+        def audio_features(self, ids):
+            raise UpstreamError(503)
+
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            guarded_call(Client(), 'audio_features', ['x'], client_kind='test-user')
+
+    assert get_breaker('test-user:audio_features').state == OPEN
+    assert get_breaker('test-public:audio_features').state == CLOSED
+
+
+def test_registry_starts_empty_for_each_test():
+    assert circuit_states() == {}
@@ -0,0 +1,97 @@
+import json
+import sys
+import pandas as pd
+import pytest
+from label_moods import CHECKPOINT_FILE, read_checkpoint, run
+from services.mood_service import MOODS, classify_moods, predict_mood
+
+
+def test_keywords_match_whole_words_and_inflections():
+    labels = classify_moods(['pumpkin spice saddle', 'clubhouse', 'sadness', 'dances in clubs'])
+    assert labels['mood'].tolist() == ['energetic', 'energetic', 'sad', 'party']
+    assert labels['confidence'].tolist() == [0.0, 0.0, 1.0, 1.0]
+
+
+def test_predict_mood_matches_batch_labels():
+    texts = ['so happy today', 'sad and melancholy', 'chill ambient evening', None]
+    assert [predict_mood(t) for t in texts] == classify_moods(texts)['mood'].tolist()
+    assert set(classify_moods(texts)['mood']) <= set(MOODS)
+
+
+def lyrics_frame():
+    return pd.DataFrame({
+        'track_id': [f't{i}' for i in range(10)],
+        'lyrics': ['happy'] * 5 + ['sad'] * 5
+    })
+
+
+def rewind_checkpoint(output_dir, rows_done):
+    path = output_dir / CHECKPOINT_FILE
+    checkpoint = json.loads(path.read_text())
+    checkpoint['rows_done'] = rows_done
+    path.write_text(json.dumps(checkpoint))
+
+
+def test_pipeline_resumes_from_checkpoint(tmp_path):
+    input_path = tmp_path / 'lyrics.csv'
+    lyrics_frame().to_csv(input_path, index=False)
+    output_dir = tmp_path / 'out'
+
+    run(str(input_path), str(output_dir), id_column='track_id', chunk_size=4,
+        workers=1, output_format='csv')
+    assert read_checkpoint(str(output_dir)) == 10
+
+    # Rewind to mid-file and check the rerun only relabels the tail
+    rewind_checkpoint(output_dir, 8)
+    (output_dir / 'part-000000000008.csv').unlink()
+    run(str(input_path), str(output_dir), id_column='track_id', chunk_size=4,
+        workers=1, output_format='csv')
+
+    parts = sorted(output_dir.glob('part-*.csv'))
+    labels = pd.concat(pd.read_csv(part) for part in parts)
+    assert labels['row'].tolist() == list(range(10))
+    assert labels['track_id'].tolist() == [f't{i}' for i in range(10)]
+    assert labels['mood'].tolist() == ['happy'] * 5 + ['sad'] * 5
+
+
+def test_resume_refuses_a_different_run(tmp_path):
+    input_path = tmp_path / 'lyrics.csv'
+    other_path = tmp_path / 'other.csv'
+    lyrics_frame().to_csv(input_path, index=False)
+    lyrics_frame().to_csv(other_path, index=False)
+    output_dir = tmp_path / 'out'
+    run(str(input_path), str(output_dir), workers=1, output_format='csv')
+
+    with pytest.raises(ValueError, match='input'):
+        run(str(other_path), str(output_dir), workers=1, output_format='csv')
+    with pytest.raises(ValueError, match='id_column'):
+        run(str(input_path), str(output_dir), id_column='track_id', workers=1, output_format='csv')
+
+
+def test_parquet_resume_skips_whole_row_groups(tmp_path):
+    pytest.importorskip('pyarrow')
+    input_path = tmp_path / 'lyrics.parquet'
+    lyrics_frame().to_parquet(input_path, row_group_size=3)
+    output_dir = tmp_path / 'out'
+
+    run(str(input_path), str(output_dir), chunk_size=3, workers=1)
+    rewind_checkpoint(output_dir, 7)
+    for part in output_dir.glob('part-*.parquet'):
+        if int(part.stem.split('-')[1]) >= 6:
+            part.unlink()
+    run(str(input_path), str(output_dir), chunk_size=3, workers=1)
+
+    labels = pd.concat(pd.read_parquet(part) for part in sorted(output_dir.glob('part-*.parquet')))
+    # Row 6 was dropped with its part; the resume starts mid row group at row 7
+    assert labels['row'].tolist() == [0, 1, 2, 3, 4, 5, 7, 8, 9]
+    assert labels['mood'].tolist() == ['happy'] * 5 + ['sad'] * 4
+
+
+def test_missing_pyarrow_raises_import_error(tmp_path, monkeypatch):
+    input_path = tmp_path / 'lyrics.csv'
+    lyrics_frame().to_csv(input_path, index=False)
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+
+    with pytest.raises(ImportError, match='pyarrow'):
+        run(str(input_path), str(tmp_path / 'out'), workers=1)
+    assert not (tmp_path / 'out').exists()
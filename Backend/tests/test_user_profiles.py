@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+from models.user import (
+    PROFILE_DTYPE, RECENT_TRACK_SLOTS, TOP_GENRE_SLOTS, UserProfileStore,
+    blend_mood_features, normalize_genre, refresh_user_profile
+)
+from utils import get_fallback_genres
+
+
+def features(valence, energy=0.5):
+    return {
+        'valence': valence, 'energy': energy, 'danceability': 0.5,
+        'acousticness': 0.1, 'instrumentalness': 0.0
+    }
+
+
+class FakeUserClient:
+    """Serves separate top and saved tracks, newest saved first, like Spotify"""
+
+    def __init__(self, top_ids=('track1',), saved_ids=('track1',), pulls_fail=False,
+                 features_fail=False, valence=0.5):
+        self.top_ids = top_ids
+        self.saved_ids = saved_ids
+        self.pulls_fail = pulls_fail
+        self.features_fail = features_fail
+        self.valence = valence
+
+    @staticmethod
+    def track(track_id):
+        return {'id': track_id, 'artists': [{'id': f'artist-{track_id}'}]}
+
+    def current_user_top_tracks(self, limit):
+        if self.pulls_fail:
+            raise ConnectionError('top tracks unavailable')
+        return {'items': [self.track(t) for t in self.top_ids]}
+
+    def current_user_saved_tracks(self, limit):
+        if self.pulls_fail:
+            raise ConnectionError('saved tracks unavailable')
+        return {'items': [{'track': self.track(t)} for t in self.saved_ids]}
+
+    def audio_features(self, track_ids):
+        if self.features_fail:
+            raise ConnectionError('audio features unavailable')
+        return [features(self.valence) for _ in track_ids]
+
+    def artists(self, artist_ids):
+        return {'artists': [{'genres': ['dance pop']} for _ in artist_ids]}
+
+
+def test_row_stays_in_hundreds_of_bytes():
+    assert PROFILE_DTYPE.itemsize < 300
+
+
+def test_batched_variance_matches_numpy():
+    store = UserProfileStore(capacity=1)
+    values = [0.1, 0.4, 0.35, 0.9, 0.6]
+    store.add_tracks('u', [features(v) for v in values[:2]])
+    store.add_tracks('u', [features(v) for v in values[2:]] + [None])
+
+    assert store.centroid('u')['valence'] == pytest.approx(np.mean(values), abs=1e-4)
+    assert store.variance('u')['valence'] == pytest.approx(np.var(values), abs=1e-4)
+    assert store.summary('u')['tracks_profiled'] == len(values)
+
+
+def test_store_grows_past_capacity():
+    store = UserProfileStore(capacity=1)
+    for i in range(5):
+        store.add_tracks(f'u{i}', [features(i / 10)])
+    assert len(store) == 5
+    assert store.centroid('u0')['valence'] == 0.0
+    assert store.centroid('u4')['valence'] == pytest.approx(0.4)
+
+
+def test_space_saving_keeps_heaviest_genres():
+    store = UserProfileStore()
+    genres = get_fallback_genres()[:TOP_GENRE_SLOTS + 4]
+    for count, genre in enumerate(genres, start=1):
+        store.add_tracks('u', genres=[genre] * count)
+
+    top = store.top_genres('u', limit=TOP_GENRE_SLOTS)
+    assert len(top) == TOP_GENRE_SLOTS
+    assert top[0] == genres[-1]
+    assert genres[0] not in top
+
+
+def test_recent_ring_is_newest_first_and_bounded():
+    store = UserProfileStore()
+    store.add_tracks('u', track_ids=[f'id{i}' for i in range(RECENT_TRACK_SLOTS + 3)])
+    store.add_tracks('u', track_ids=['id10'])
+
+    recent = store.recent_track_ids('u')
+    assert len(recent) == RECENT_TRACK_SLOTS
+    assert recent[0] == f'id{RECENT_TRACK_SLOTS + 2}'
+    assert recent[-1] == 'id3'
+
+
+def test_refresh_rebuilds_instead_of_double_counting():
+    store = UserProfileStore()
+    refresh_user_profile(FakeUserClient(), 'u', store)
+    summary = refresh_user_profile(FakeUserClient(), 'u', store)
+
+    assert summary['tracks_profiled'] == 1
+    assert summary['top_genres'] == ['pop']
+    assert summary['recent_track_ids'] == ['track1']
+
+
+def test_recent_ring_holds_recently_saved_tracks():
+    client = FakeUserClient(
+        top_ids=[f'top{i}' for i in range(20)],
+        saved_ids=[f'saved{i}' for i in range(20)]
+    )
+    summary = refresh_user_profile(client, 'u', UserProfileStore())
+
+    assert summary['tracks_profiled'] == 40
+    assert summary['recent_track_ids'] == [f'saved{i}' for i in range(RECENT_TRACK_SLOTS)]
+
+
+def test_failed_pulls_keep_profile_and_stay_stale():
+    store = UserProfileStore()
+    refresh_user_profile(FakeUserClient(top_ids=['a', 'b'], saved_ids=['c']), 'u', store)
+    store.rebuild('u', now=0)
+    before = store.summary('u')
+
+    summary = refresh_user_profile(FakeUserClient(pulls_fail=True), 'u', store)
+
+    assert summary == before
+    assert summary['tracks_profiled'] == 3
+    assert store.is_stale('u')
+
+
+def test_failed_audio_features_keep_feature_stats():
+    store = UserProfileStore()
+    refresh_user_profile(FakeUserClient(top_ids=[], saved_ids=['a', 'b'], valence=0.2), 'u', store)
+
+    summary = refresh_user_profile(
+        FakeUserClient(top_ids=['x'], saved_ids=['y'], features_fail=True), 'u', store
+    )
+
+    assert summary['tracks_profiled'] == 2
+    assert summary['centroid']['valence'] == pytest.approx(0.2)
+    assert summary['recent_track_ids'] == ['y']
+    assert not store.is_stale('u')
+
+
+def test_profiles_go_stale():
+    store = UserProfileStore()
+    assert store.is_stale('u')
+    store.rebuild('u', [features(0.5)], now=1000)
+    assert not store.is_stale('u', max_age=60, now=1030)
+    assert store.is_stale('u', max_age=60, now=1100)
+
+
+def test_normalize_genre():
+    vocab = get_fallback_genres()
+    assert vocab[normalize_genre('R&B')] == 'r-n-b'
+    assert vocab[normalize_genre('uk hip hop')] == 'hip-hop'
+    assert vocab[normalize_genre('dance pop')] == 'pop'
+    assert normalize_genre('vaporwave') is None
+
+
+def test_blend_only_touches_profiled_targets():
+    blended = blend_mood_features(
+        {'target_valence': 0.8, 'target_tempo': 120},
+        {'valence': 0.2},
+        weight=0.5
+    )
+    assert blended == {'target_valence': 0.5, 'target_tempo': 120}
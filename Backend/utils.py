@@ -1,3 +1,5 @@
+from services.circuit_breaker import guarded_call
+
 def enhance_track_with_play_urls(track):
     """Add play URLs and formatted duration to a track object"""
     if not track:
@@ -70,7 +72,7 @@ def safe_get_genres(sp_client, fallback_genres=None):
         fallback_genres = ['pop', 'rock', 'jazz']
     
     try:
-        genres_response = sp_client.recommendation_genre_seeds()
+        genres_response = guarded_call(sp_client, 'recommendation_genre_seeds')
         return genres_response.get('genres', fallback_genres)
     except Exception as e:
         print(f"Could not get genres from Spotify: {e}")